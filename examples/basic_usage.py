@@ -75,7 +75,7 @@ async def main():
         executor_id="exec_001",
         name="Иван Петров",
         phone_number="+79991234567",  # Replace with real number
-        skills=["delivery", "cargo"],
+        skills=("delivery", "cargo"),
         rating=4.8,
         is_available=True,
     )
@@ -88,7 +88,7 @@ async def main():
         datetime="Сегодня, 15:00-17:00",
         payment="3500 рублей",
         additional_info="Подъём на 5 этаж, есть грузовой лифт",
-        required_skills=["delivery", "cargo"],
+        required_skills=("delivery", "cargo"),
     )
     
     logger.info(f"Starting call to {executor.name} for order {order.order_id}")
@@ -98,6 +98,7 @@ async def main():
     
     if session_id is None:
         logger.error("Failed to start call")
+        await agent.speech.close()
         agent.close()
         return
     
@@ -110,6 +111,9 @@ async def main():
     # Simulate dialogue (in production, this would be handled by Voximplant callbacks)
     # Here we simulate the executor's responses for demonstration
     
+    # Keep a reference so the session stays available after it completes
+    session = agent.get_session(session_id)
+    
     simulated_responses = [
         "Да, здравствуйте. Что за заказ?",
         "Хорошо, а сколько по времени это займёт?",
@@ -128,12 +132,13 @@ async def main():
         logger.info(f"Agent responds: {agent_response}")
         
         # Check if call ended
-        session = agent.get_session(session_id)
         if session and session.result != CallResult.IN_PROGRESS:
             logger.info(f"Call ended with result: {session.result.value}")
             break
     
     # Cleanup
+    await agent.wait_background_tasks()
+    await agent.speech.close()
     agent.close()
     logger.info("Example completed")
 
@@ -1,18 +1,32 @@
 """Main AI Agent class that orchestrates dialogue with executors."""
 import asyncio
 import logging
-from typing import Optional, List, Callable, Dict, Tuple
+import re
+import threading
+import weakref
+from typing import Optional, List, Callable, Dict, Mapping, Set, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
+from functools import cached_property
+from types import MappingProxyType
 
 from ..utils.config import Config
-from ..integrations.gigachat_client import GigaChatClient, DialogueContext, DialogueMessage
+from ..integrations.gigachat_client import (
+    GigaChatClient,
+    DialogueContext,
+    DialogueHistory,
+    DialogueMessage,
+)
 from ..integrations.salute_speech_client import SaluteSpeechClient
 from ..integrations.voximplant_client import VoximplantClient, ExecutorInfo, CallInfo
 from ..integrations.qdrant_client import QdrantKnowledgeBase
+from .semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
+# End of a sentence in a streamed response
+_SENTENCE_END_RE = re.compile(r"[.!?…]+\s+")
+
 
 class CallResult(Enum):
     """Result of a call to an executor."""
@@ -23,7 +37,7 @@ class CallResult(Enum):
     IN_PROGRESS = "in_progress"
 
 
-@dataclass
+@dataclass(frozen=True)
 class OrderInfo:
     """Information about an order to be offered to executors."""
     
@@ -33,7 +47,27 @@ class OrderInfo:
     datetime: str
     payment: str
     additional_info: Optional[str] = None
-    required_skills: List[str] = field(default_factory=list)
+    required_skills: Tuple[str, ...] = ()
+    
+    @cached_property
+    def _fields_view(self) -> Mapping[str, Optional[str]]:
+        """Read-only order fields, built once and shared by all sessions."""
+        return MappingProxyType({
+            "description": self.description,
+            "address": self.address,
+            "datetime": self.datetime,
+            "payment": self.payment,
+            "additional_info": self.additional_info,
+        })
+    
+    @property
+    def as_dict(self) -> dict:
+        """Order fields used in prompts and call scenarios.
+        
+        Returns:
+            A new dict, safe to modify and to serialize
+        """
+        return dict(self._fields_view)
 
 
 @dataclass
@@ -46,6 +80,7 @@ class CallSession:
     dialogue_context: DialogueContext
     result: CallResult = CallResult.IN_PROGRESS
     turn_count: int = 0
+    completed: asyncio.Event = field(default_factory=asyncio.Event)
 
 
 class AIAgent:
@@ -65,19 +100,58 @@ class AIAgent:
             config: Configuration object with all necessary settings
         """
         self.config = config
+        self._agent_name = config.agent_name
+        self._company_name = config.company_name
+        self._max_turns = config.max_dialogue_turns
+        self._template_shortcut = config.enable_template_shortcut
         
         # Initialize integration clients
         self.gigachat = GigaChatClient(config.gigachat)
         self.speech = SaluteSpeechClient(config.salute_speech)
         self.telephony = VoximplantClient(config.voximplant)
-        self.knowledge_base = QdrantKnowledgeBase(config.qdrant)
+        self.knowledge_base = QdrantKnowledgeBase(
+            config.qdrant,
+            embeddings_client=self.gigachat.sdk_client,
+        )
+        
+        # Knowledge context cache for similar orders
+        self._knowledge_cache = SemanticCache(
+            max_size=config.knowledge_cache_size,
+            threshold=config.knowledge_cache_threshold,
+        )
         
         # Active sessions
         self._active_sessions: Dict[str, CallSession] = {}
         
+        # Completed sessions are kept only while referenced elsewhere
+        self._completed_sessions: "weakref.WeakValueDictionary[str, CallSession]" = (
+            weakref.WeakValueDictionary()
+        )
+        
+        # Background tasks kept off the call's critical path
+        self._background: Set[asyncio.Task] = set()
+        
         # Callbacks
         self._on_call_completed: Optional[Callable[[CallSession], None]] = None
         
+        # Warm up connections so the first call doesn't pay for them
+        self._warm_done = threading.Event()
+        if config.warmup_on_start:
+            threading.Thread(target=self._warm, daemon=True).start()
+        else:
+            self._warm_done.set()
+        
+    def _warm(self):
+        """Initialize integration clients and open their connections."""
+        try:
+            self.gigachat.warmup()
+            self.knowledge_base.warmup()
+            self.telephony.warmup()
+        except Exception as e:
+            logger.warning(f"Warm-up failed: {e}")
+        finally:
+            self._warm_done.set()
+    
     def set_on_call_completed(self, callback: Callable[[CallSession], None]):
         """Set callback for when a call is completed.
         
@@ -100,22 +174,34 @@ class AIAgent:
         Returns:
             Call session ID or None if failed
         """
-        # Get relevant knowledge from the knowledge base
+        # Give the background warm-up a moment to finish
+        if not self._warm_done.is_set():
+            await asyncio.to_thread(self._warm_done.wait, 1.0)
+        
+        # Get relevant knowledge from the knowledge base; the embedding,
+        # search and call start below are blocking network calls, so they
+        # run in threads and concurrent calls are set up in parallel
         knowledge_query = f"{order.description} {order.additional_info or ''}"
-        knowledge_context = self.knowledge_base.get_context_for_query(knowledge_query)
+        query_embedding = await asyncio.to_thread(
+            self.knowledge_base.embed_query, knowledge_query
+        )
+        knowledge_context = self._knowledge_cache.get(query_embedding)
+        if knowledge_context is None:
+            knowledge_context = await asyncio.to_thread(
+                self.knowledge_base.get_context_for_query,
+                knowledge_query,
+                query_embedding=query_embedding,
+            )
+            # An empty context may come from an unavailable knowledge base,
+            # so it is not cached and the lookup is retried next time
+            if knowledge_context:
+                self._knowledge_cache.put(query_embedding, knowledge_context)
         
-        # Prepare order info dict
-        order_dict = {
-            "description": order.description,
-            "address": order.address,
-            "datetime": order.datetime,
-            "payment": order.payment,
-            "additional_info": order.additional_info,
-        }
+        order_dict = order._fields_view
         
         # Create dialogue context
         dialogue_context = DialogueContext(
-            messages=[],
+            messages=DialogueHistory(self.config.max_history_messages),
             order_info=order_dict,
             executor_info={
                 "id": executor.executor_id,
@@ -123,16 +209,29 @@ class AIAgent:
             },
             knowledge_context=knowledge_context,
         )
+        dialogue_context.system_prompt = self.gigachat.create_system_prompt(
+            agent_name=self._agent_name,
+            company_name=self._company_name,
+            order_info=order_dict,
+            knowledge_context=knowledge_context,
+        )
         
         # Start the call via Voximplant
-        call_info = self.telephony.start_call(
+        start = asyncio.ensure_future(asyncio.to_thread(
+            self.telephony.start_call,
             executor=executor,
-            order_info=order_dict,
+            order_info=dict(order_dict),
             custom_data={
-                "agent_name": self.config.agent_name,
-                "company_name": self.config.company_name,
+                "agent_name": self._agent_name,
+                "company_name": self._company_name,
             },
-        )
+        ))
+        try:
+            call_info = await asyncio.shield(start)
+        except asyncio.CancelledError:
+            # The thread places the call anyway, so end it once it's started
+            start.add_done_callback(self._end_abandoned_call)
+            raise
         
         if call_info is None:
             logger.error(f"Failed to start call to {executor.name}")
@@ -187,6 +286,8 @@ class AIAgent:
         
         # Analyze response intent
         analysis = self.gigachat.analyze_response(text_response)
+        response_audio = None
+        synthesized = False
         
         # Check if dialogue should end
         if analysis["intent"] == "accept":
@@ -201,18 +302,36 @@ class AIAgent:
                 f"Понимаю, {session.executor.name}. Спасибо за ответ. "
                 f"Если передумаете, мы на связи. Хорошего дня!"
             )
-        elif session.turn_count >= self.config.max_dialogue_turns:
+        elif session.turn_count >= self._max_turns:
             session.result = CallResult.DECLINED
             response_text = (
                 "К сожалению, нам нужно завершить разговор. "
                 "Спасибо за ваше время. До свидания!"
             )
+        elif (
+            analysis["intent"] == "question"
+            and self._template_shortcut
+            and (
+                answer := await asyncio.to_thread(
+                    self._answer_from_knowledge, text_response
+                )
+            ) is not None
+        ):
+            # Question is covered by the knowledge base, no LLM call needed;
+            # the lookup embeds and searches synchronously, so run it off the loop
+            response_text = answer
+        elif self.config.gigachat.stream_responses:
+            # Stream AI response and synthesize speech sentence by sentence;
+            # failed sentences are already retried, so the reply isn't
+            # synthesized again below
+            response_text, response_audio = await self._stream_response(session)
+            synthesized = True
         else:
             # Generate AI response for continued dialogue
-            response_text = self.gigachat.generate_response(
+            response_text = await self.gigachat.generate_response(
                 context=session.dialogue_context,
-                agent_name=self.config.agent_name,
-                company_name=self.config.company_name,
+                agent_name=self._agent_name,
+                company_name=self._company_name,
             )
         
         # Add agent's response to dialogue
@@ -221,7 +340,8 @@ class AIAgent:
         )
         
         # Convert response to speech
-        response_audio = await self.speech.text_to_speech(response_text)
+        if not synthesized:
+            response_audio = await self.speech.text_to_speech(response_text)
         
         # Check if call should end
         if session.result != CallResult.IN_PROGRESS:
@@ -229,6 +349,92 @@ class AIAgent:
         
         return response_text, response_audio
     
+    def _answer_from_knowledge(self, question: str) -> Optional[str]:
+        """Build a templated answer from the best matching knowledge document.
+        
+        Args:
+            question: Executor's question
+            
+        Returns:
+            Answer text, or None if no document is similar enough
+        """
+        documents = self.knowledge_base.search(
+            question,
+            limit=1,
+            score_threshold=self.config.template_shortcut_threshold,
+        )
+        if not documents:
+            return None
+        
+        return f"{documents[0].content.rstrip('. ')}. Готовы принять заказ?"
+    
+    async def _stream_response(
+        self,
+        session: CallSession,
+    ) -> Tuple[str, Optional[bytes]]:
+        """Stream AI response and start speech synthesis per sentence.
+        
+        Synthesis of each complete sentence starts while the rest of the
+        response is still being generated. Sentences whose synthesis fails
+        are retried once; if any still fails, no audio is returned.
+        
+        Args:
+            session: Active call session
+            
+        Returns:
+            Tuple of (response text, response audio data)
+        """
+        text_parts = []
+        sentences = []
+        tts_tasks = []
+        buffer = ""
+        
+        def synthesize(sentence: str):
+            sentence = sentence.strip()
+            if sentence:
+                sentences.append(sentence)
+                tts_tasks.append(asyncio.create_task(
+                    self.speech.text_to_speech(sentence, audio_format="pcm16")
+                ))
+        
+        async for delta in self.gigachat.generate_response_stream(
+            context=session.dialogue_context,
+            agent_name=self._agent_name,
+            company_name=self._company_name,
+        ):
+            text_parts.append(delta)
+            buffer += delta
+            
+            # Send every complete sentence to TTS right away
+            end = 0
+            for match in _SENTENCE_END_RE.finditer(buffer):
+                end = match.end()
+            if end:
+                synthesize(buffer[:end])
+                buffer = buffer[end:]
+        
+        synthesize(buffer)
+        
+        audio_chunks = list(await asyncio.gather(*tts_tasks))
+        
+        # Retry only the sentences whose synthesis failed
+        failed = [i for i, chunk in enumerate(audio_chunks) if chunk is None]
+        if failed:
+            retried = await asyncio.gather(*(
+                self.speech.text_to_speech(sentences[i], audio_format="pcm16")
+                for i in failed
+            ))
+            for i, chunk in zip(failed, retried):
+                audio_chunks[i] = chunk
+        
+        if audio_chunks and all(chunk is not None for chunk in audio_chunks):
+            response_audio = self.speech.pcm_to_wav(b"".join(audio_chunks))
+        else:
+            logger.error("Speech synthesis failed for the streamed response")
+            response_audio = None
+        
+        return "".join(text_parts), response_audio
+    
     async def generate_initial_greeting(
         self,
         session_id: str,
@@ -246,17 +452,12 @@ class AIAgent:
             logger.error(f"Session not found: {session_id}")
             return "Сессия не найдена", None
         
-        order_dict = {
-            "description": session.order.description,
-            "address": session.order.address,
-            "datetime": session.order.datetime,
-            "payment": session.order.payment,
-        }
+        order_dict = session.order._fields_view
         
         # Generate greeting
         greeting_text = self.gigachat.generate_initial_greeting(
-            agent_name=self.config.agent_name,
-            company_name=self.config.company_name,
+            agent_name=self._agent_name,
+            company_name=self._company_name,
             executor_name=session.executor.name,
             order_info=order_dict,
         )
@@ -277,12 +478,14 @@ class AIAgent:
         Args:
             session_id: ID of the call session
         """
-        session = self._active_sessions.get(session_id)
+        session = self._active_sessions.pop(session_id, None)
         if session is None:
             return
+        self._completed_sessions[session_id] = session
         
         # End the call in telephony system
         self.telephony.end_call(session_id, session.result.value)
+        session.completed.set()
         
         # Notify callback
         if self._on_call_completed:
@@ -296,14 +499,35 @@ class AIAgent:
                 f"Время: {session.order.datetime}\n"
                 f"Оплата: {session.order.payment}"
             )
-            self.telephony.send_sms(session.executor.phone_number, sms_text)
+            self._run_in_background(
+                self.telephony.send_sms, session.executor.phone_number, sms_text
+            )
         
         logger.info(
             f"Session completed: {session_id}, result: {session.result.value}"
         )
     
+    def _run_in_background(self, func: Callable, *args):
+        """Run a blocking call in a worker thread without awaiting it.
+        
+        Args:
+            func: Function to call
+            *args: Arguments for the function
+        """
+        task = asyncio.create_task(asyncio.to_thread(func, *args))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    async def wait_background_tasks(self):
+        """Wait for pending background tasks (e.g. SMS sending) to finish."""
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+    
     def get_session(self, session_id: str) -> Optional[CallSession]:
-        """Get an active call session.
+        """Get a call session.
+        
+        Completed sessions are available only while they are still
+        referenced elsewhere (e.g. by a completion callback).
         
         Args:
             session_id: ID of the session
@@ -311,7 +535,10 @@ class AIAgent:
         Returns:
             CallSession or None if not found
         """
-        return self._active_sessions.get(session_id)
+        session = self._active_sessions.get(session_id)
+        if session is None:
+            session = self._completed_sessions.get(session_id)
+        return session
     
     def get_active_sessions(self) -> List[CallSession]:
         """Get all active call sessions.
@@ -326,13 +553,19 @@ class AIAgent:
         executors: List[ExecutorInfo],
         order: OrderInfo,
         concurrent_calls: int = 1,
+        call_timeout: float = 120.0,
     ) -> Optional[ExecutorInfo]:
         """Call multiple executors until one accepts the order.
         
+        Calls within a batch run concurrently; as soon as one executor
+        accepts, the remaining calls of the batch are ended.
+        
         Args:
             executors: List of executors to call (in priority order)
             order: The order to offer
             concurrent_calls: Number of concurrent calls to make
+            call_timeout: Maximum time to wait for a call to complete in
+                seconds; unfinished calls are ended as not answered
             
         Returns:
             The executor who accepted, or None if all declined
@@ -340,25 +573,88 @@ class AIAgent:
         for i in range(0, len(executors), concurrent_calls):
             batch = executors[i:i + concurrent_calls]
             
-            # Start calls for this batch
-            session_ids = []
-            for executor in batch:
-                if not executor.is_available:
-                    continue
-                    
-                session_id = await self.call_executor(executor, order)
-                if session_id:
-                    session_ids.append(session_id)
+            tasks = [
+                asyncio.create_task(self._run_one(executor, order, call_timeout))
+                for executor in batch
+                if executor.is_available
+            ]
             
-            # Wait for results (simplified - in production, use proper async handling)
-            # This would be integrated with Voximplant's callback system
-            for session_id in session_ids:
-                session = self.get_session(session_id)
-                if session and session.result == CallResult.ACCEPTED:
-                    return session.executor
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    session = await next_done
+                    if session and session.result == CallResult.ACCEPTED:
+                        return session.executor
+            finally:
+                for task in tasks:
+                    task.cancel()
+                # Let cancelled calls end their sessions before moving on
+                await asyncio.gather(*tasks, return_exceptions=True)
         
         return None
     
+    async def _run_one(
+        self,
+        executor: ExecutorInfo,
+        order: OrderInfo,
+        timeout: float = 120.0,
+    ) -> Optional[CallSession]:
+        """Call an executor and wait until the call session is completed.
+        
+        If the wait times out or is cancelled, the call is ended and its
+        session completed as not answered.
+        
+        Args:
+            executor: Information about the executor to call
+            order: Information about the order to offer
+            timeout: Maximum time to wait for completion in seconds
+            
+        Returns:
+            The call session, or None if the call could not be started
+        """
+        session_id = await self.call_executor(executor, order)
+        if session_id is None:
+            return None
+        
+        session = self.get_session(session_id)
+        if session is None:
+            return None
+        
+        try:
+            await asyncio.wait_for(session.completed.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out waiting for session: {session_id}")
+            await self._end_unfinished(session_id)
+        except asyncio.CancelledError:
+            await self._end_unfinished(session_id)
+            raise
+        
+        return session
+    
+    async def _end_unfinished(self, session_id: str):
+        """End a call that is still in progress as not answered.
+        
+        Args:
+            session_id: ID of the call session
+        """
+        session = self._active_sessions.get(session_id)
+        if session is None:
+            return
+        if session.result == CallResult.IN_PROGRESS:
+            session.result = CallResult.NO_ANSWER
+        await self._complete_session(session_id)
+    
+    def _end_abandoned_call(self, start: "asyncio.Future[Optional[CallInfo]]"):
+        """End a call whose setup was cancelled before a session was created.
+        
+        Args:
+            start: Finished call start future
+        """
+        if start.cancelled() or start.exception() is not None:
+            return
+        call_info = start.result()
+        if call_info is not None:
+            self.telephony.end_call(call_info.call_id, CallResult.NO_ANSWER.value)
+    
     def add_knowledge_documents(
         self,
         documents: List[dict],
@@ -371,6 +667,7 @@ class AIAgent:
         Returns:
             True if successful
         """
+        self._knowledge_cache.clear()
         return self.knowledge_base.add_documents(documents)
     
     def search_knowledge_base(
@@ -410,4 +707,7 @@ class AIAgent:
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit."""
+        await self.wait_background_tasks()
+        await self.gigachat.aclose()
+        await self.speech.close()
         self.close()
@@ -0,0 +1,112 @@
+"""Semantic cache for knowledge base context lookups."""
+import threading
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+class SemanticCache:
+    """Caches retrieved context by query embedding similarity.
+    
+    Embeddings are stored L2-normalized as rows of a preallocated matrix,
+    so a lookup is a single matrix-vector product. When the cache is full,
+    the least recently used row is overwritten.
+    """
+    
+    def __init__(self, max_size: int = 256, threshold: float = 0.95):
+        """Initialize the semantic cache.
+        
+        Args:
+            max_size: Maximum number of cached entries (0 disables caching)
+            threshold: Minimum cosine similarity for a cache hit
+        """
+        self.max_size = max_size
+        self.threshold = threshold
+        self._vectors: Optional[np.ndarray] = None
+        self._last_used: np.ndarray = np.zeros(max(max_size, 0), dtype=np.int64)
+        self._contexts: List[str] = []
+        self._clock = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> Optional[np.ndarray]:
+        """Convert an embedding to a unit-length float32 vector.
+        
+        Args:
+            embedding: Embedding vector
+        
+        Returns:
+            Normalized vector or None for a zero vector
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+    
+    def get(self, embedding: Sequence[float]) -> Optional[str]:
+        """Get cached context for a query embedding.
+        
+        Args:
+            embedding: Query embedding vector
+        
+        Returns:
+            Cached context or None if no similar query is cached
+        """
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+        
+        with self._lock:
+            count = len(self._contexts)
+            if count == 0 or self._vectors.shape[1] != query.shape[0]:
+                return None
+            
+            sims = self._vectors[:count] @ query
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                return None
+            
+            self._clock += 1
+            self._last_used[best] = self._clock
+            return self._contexts[best]
+    
+    def put(self, embedding: Sequence[float], context: str):
+        """Store context for a query embedding.
+        
+        Args:
+            embedding: Query embedding vector
+            context: Context retrieved for the query
+        """
+        if self.max_size <= 0:
+            return
+        
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._vectors = np.zeros(
+                    (self.max_size, vector.shape[0]), dtype=np.float32
+                )
+                self._contexts = []
+            
+            count = len(self._contexts)
+            if count < self.max_size:
+                index = count
+                self._contexts.append(context)
+            else:
+                index = int(np.argmin(self._last_used))
+                self._contexts[index] = context
+            
+            self._vectors[index] = vector
+            self._clock += 1
+            self._last_used[index] = self._clock
+    
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._contexts = []
+            self._last_used[:] = 0
+            self._clock = 0
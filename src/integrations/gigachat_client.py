@@ -1,32 +1,225 @@
 """GigaChat integration for AI dialogue management."""
+import asyncio
+import hashlib
 import logging
-from typing import List, Optional
+import re
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
 
 from gigachat import GigaChat
-from gigachat.models import Chat, Messages, MessagesRole
+from gigachat.models import Chat, ChatCompletion, Messages, MessagesRole
 
+from ..utils.cache import QueryCache
 from ..utils.config import GigaChatConfig
+from ..utils.serialization import dumps
 
 logger = logging.getLogger(__name__)
 
+# Keywords used to detect executor's intent
+POSITIVE_WORDS = ("да", "согласен", "принимаю", "готов", "хорошо", "ладно", "окей", "конечно")
+NEGATIVE_WORDS = ("нет", "не могу", "отказываюсь", "занят", "не готов", "не интересует")
+QUESTION_WORDS = ("что", "какой", "когда", "где", "сколько", "почему", "как")
 
-@dataclass
+
+def _compile_keywords(words) -> "re.Pattern[str]":
+    """Compile a keyword list into a single alternation over casefolded text."""
+    return re.compile("|".join(re.escape(word.casefold()) for word in words))
+
+
+# Compiled once at import; each class is matched separately so that
+# overlapping keywords (e.g. "готов" inside "не готов") are still detected
+_POSITIVE_RE = _compile_keywords(POSITIVE_WORDS)
+_NEGATIVE_RE = _compile_keywords(NEGATIVE_WORDS)
+_QUESTION_RE = _compile_keywords(QUESTION_WORDS)
+
+
+@dataclass(slots=True)
 class DialogueMessage:
     """Represents a single message in the dialogue."""
     
     role: str  # "user", "assistant", or "system"
     content: str
+    api_message: Optional[Messages] = field(default=None, repr=False, compare=False)
+
+
+class DialogueHistory:
+    """Bounded dialogue history sent to the model.
+    
+    Keeps the first message (the greeting presenting the order) pinned
+    and only the most recent messages after it, so the prompt size stays
+    constant in long dialogues.
+    """
+    
+    __slots__ = ("anchor", "_recent")
+    
+    def __init__(self, max_messages: int = 16):
+        """Initialize dialogue history.
+        
+        Args:
+            max_messages: Maximum number of messages kept, including the anchor;
+                values below 2 are raised to 2 (the anchor and the latest message)
+        """
+        max_messages = max(max_messages, 2)
+        self.anchor: Optional[DialogueMessage] = None
+        self._recent: "deque[DialogueMessage]" = deque(maxlen=max_messages - 1)
+    
+    def append(self, message: DialogueMessage):
+        """Add a message, dropping the oldest non-anchor one if full.
+        
+        Args:
+            message: Message to add
+        """
+        if self.anchor is None:
+            self.anchor = message
+        else:
+            self._recent.append(message)
+    
+    def __iter__(self) -> Iterator[DialogueMessage]:
+        """Iterate over the anchor and the recent messages in order."""
+        if self.anchor is not None:
+            yield self.anchor
+        yield from self._recent
+    
+    def __len__(self) -> int:
+        """Number of messages kept."""
+        return len(self._recent) + (self.anchor is not None)
 
 
-@dataclass
+@dataclass(slots=True)
 class DialogueContext:
     """Maintains the context of the ongoing dialogue."""
     
-    messages: List[DialogueMessage] = field(default_factory=list)
+    messages: DialogueHistory = field(default_factory=DialogueHistory)
     order_info: Optional[dict] = None
     executor_info: Optional[dict] = None
     knowledge_context: Optional[str] = None
+    system_prompt: Optional[str] = None
+    system_message: Optional[Messages] = None
+
+
+class ChatBatcher:
+    """Coalesces concurrent chat requests and sends them together.
+    
+    Requests submitted within ``max_wait_ms`` of each other (up to
+    ``batch_size`` of them) are dispatched as one group of concurrent
+    calls over the shared GigaChat client.
+    """
+    
+    def __init__(
+        self,
+        get_client: Callable[[], GigaChat],
+        batch_size: int = 8,
+        max_wait_ms: float = 50.0,
+    ):
+        """Initialize the batcher.
+        
+        Args:
+            get_client: Callable returning the GigaChat client to use
+            batch_size: Maximum number of requests in a batch
+            max_wait_ms: Maximum time to wait for a batch to fill
+        """
+        self._get_client = get_client
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._pending: List[Tuple[Chat, asyncio.Future]] = []
+        self._in_flight: Set[asyncio.Task] = set()
+    
+    def _ensure_worker(self):
+        """Start the background drain task if it is not running."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._drain())
+    
+    async def submit(self, chat: Chat) -> ChatCompletion:
+        """Submit a chat request and wait for its completion.
+        
+        Args:
+            chat: Chat request
+            
+        Returns:
+            Chat completion returned by GigaChat
+        """
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((chat, future))
+        return await future
+    
+    async def _drain(self):
+        """Collect queued requests into batches and dispatch them.
+        
+        A request that arrives alone is sent right away; the batch window
+        is only waited for when other requests are already queued.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            self._pending = [await self._queue.get()]
+            batch = self._pending
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            
+            if len(batch) > 1:
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(
+                            await asyncio.wait_for(self._queue.get(), timeout)
+                        )
+                    except asyncio.TimeoutError:
+                        break
+            
+            self._pending = []
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+    
+    async def _dispatch(self, batch: List[Tuple[Chat, asyncio.Future]]):
+        """Send a batch of requests concurrently and resolve their futures.
+        
+        Args:
+            batch: List of (chat, future) pairs
+        """
+        try:
+            client = self._get_client()
+            results = await asyncio.gather(
+                *(client.achat(chat) for chat, _ in batch),
+                return_exceptions=True,
+            )
+        except Exception as e:
+            results = [e] * len(batch)
+        
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
+    def close(self):
+        """Stop the background drain task and fail requests not yet sent.
+        
+        Requests already dispatched to GigaChat still complete normally.
+        """
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+        
+        waiting = self._pending
+        if self._queue is not None:
+            while not self._queue.empty():
+                waiting.append(self._queue.get_nowait())
+        for _, future in waiting:
+            if not future.done():
+                future.set_exception(RuntimeError("Chat batcher is closed"))
+        
+        self._pending = []
+        self._worker = None
+        self._queue = None
 
 
 class GigaChatClient:
@@ -40,6 +233,15 @@ class GigaChatClient:
         """
         self.config = config
         self._client: Optional[GigaChat] = None
+        self._cache = QueryCache(
+            max_size=config.cache_max_size,
+            ttl_seconds=config.cache_ttl_seconds,
+        )
+        self._batcher = ChatBatcher(
+            get_client=self._get_client,
+            batch_size=config.batch_size,
+            max_wait_ms=config.batch_max_wait_ms,
+        )
         
     def _get_client(self) -> GigaChat:
         """Get or create GigaChat client instance."""
@@ -52,6 +254,22 @@ class GigaChatClient:
             )
         return self._client
     
+    @property
+    def sdk_client(self) -> GigaChat:
+        """GigaChat SDK instance shared with other components.
+        
+        Reusing it keeps one authorization token and one pool of
+        keep-alive connections to the GigaChat API.
+        """
+        return self._get_client()
+    
+    def warmup(self):
+        """Fetch an access token and open a connection ahead of the first request."""
+        try:
+            self._get_client().get_models()
+        except Exception as e:
+            logger.warning(f"GigaChat warm-up failed: {e}")
+    
     def create_system_prompt(
         self,
         agent_name: str,
@@ -102,13 +320,13 @@ class GigaChatClient:
         
         return system_prompt
     
-    def generate_response(
+    def _build_messages(
         self,
         context: DialogueContext,
         agent_name: str,
         company_name: str,
-    ) -> str:
-        """Generate AI response based on dialogue context.
+    ) -> List[Messages]:
+        """Build the list of messages to send for a dialogue.
         
         Args:
             context: Current dialogue context
@@ -116,40 +334,142 @@ class GigaChatClient:
             company_name: Name of the company
             
         Returns:
-            Generated response text
+            System message followed by the dialogue history
         """
-        client = self._get_client()
+        # System message is rendered once per dialogue and reused
+        if context.system_message is None:
+            if context.system_prompt is None:
+                context.system_prompt = self.create_system_prompt(
+                    agent_name=agent_name,
+                    company_name=company_name,
+                    order_info=context.order_info or {},
+                    knowledge_context=context.knowledge_context,
+                )
+            context.system_message = Messages(
+                role=MessagesRole.SYSTEM, content=context.system_prompt
+            )
         
         # Build messages list
-        messages = []
-        
-        # Add system message
-        system_prompt = self.create_system_prompt(
-            agent_name=agent_name,
-            company_name=company_name,
-            order_info=context.order_info or {},
-            knowledge_context=context.knowledge_context,
-        )
-        messages.append(Messages(role=MessagesRole.SYSTEM, content=system_prompt))
+        messages = [context.system_message]
         
-        # Add dialogue history
+        # Add dialogue history, converting each message only once
         for msg in context.messages:
-            role = MessagesRole.USER if msg.role == "user" else MessagesRole.ASSISTANT
-            messages.append(Messages(role=role, content=msg.content))
+            if msg.api_message is None:
+                role = MessagesRole.USER if msg.role == "user" else MessagesRole.ASSISTANT
+                msg.api_message = Messages(role=role, content=msg.content)
+            messages.append(msg.api_message)
+        
+        return messages
+    
+    async def generate_response(
+        self,
+        context: DialogueContext,
+        agent_name: str,
+        company_name: str,
+    ) -> str:
+        """Generate AI response based on dialogue context.
+        
+        Args:
+            context: Current dialogue context
+            agent_name: Name of the AI agent
+            company_name: Name of the company
+            
+        Returns:
+            Generated response text
+        """
+        messages = self._build_messages(context, agent_name, company_name)
+        
+        # Return cached response for an identical dialogue
+        cache_key = self._make_cache_key(messages)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         # Generate response
         try:
             chat = Chat(messages=messages)
-            response = client.chat(chat)
+            response = await self._batcher.submit(chat)
             
             if response.choices:
-                return response.choices[0].message.content
+                text = response.choices[0].message.content
+                self._cache.put(cache_key, text)
+                return text
             return "Извините, произошла ошибка. Пожалуйста, повторите."
             
         except Exception as e:
             logger.error(f"Error generating response: {e}")
             return "Извините, произошла техническая ошибка. Попробуйте позже."
     
+    async def generate_response_stream(
+        self,
+        context: DialogueContext,
+        agent_name: str,
+        company_name: str,
+    ) -> AsyncIterator[str]:
+        """Generate AI response as a stream of text deltas.
+        
+        Streamed requests go straight to the client and are not coalesced
+        by the request batcher.
+        
+        Args:
+            context: Current dialogue context
+            agent_name: Name of the AI agent
+            company_name: Name of the company
+            
+        Yields:
+            Parts of the generated response text
+        """
+        messages = self._build_messages(context, agent_name, company_name)
+        
+        cache_key = self._make_cache_key(messages)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        parts = []
+        try:
+            chat = Chat(messages=messages)
+            async for chunk in self._get_client().astream(chat):
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+                    
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            if not parts:
+                yield "Извините, произошла техническая ошибка. Попробуйте позже."
+            return
+        
+        if parts:
+            self._cache.put(cache_key, "".join(parts))
+        else:
+            yield "Извините, произошла ошибка. Пожалуйста, повторите."
+    
+    @staticmethod
+    def _make_cache_key(messages: List[Messages]) -> bytes:
+        """Build a stable cache key for a list of messages.
+        
+        Args:
+            messages: Messages sent to the model
+            
+        Returns:
+            Digest of the serialized messages
+        """
+        payload = dumps([(m.role, m.content) for m in messages])
+        return hashlib.blake2b(payload, digest_size=16).digest()
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Get response cache statistics.
+        
+        Returns:
+            Dictionary with size, hits, misses and evictions
+        """
+        return self._cache.stats()
+    
     def generate_initial_greeting(
         self,
         agent_name: str,
@@ -193,16 +513,11 @@ class GigaChatClient:
         Returns:
             Analysis result with intent and confidence
         """
-        response_lower = response.lower()
-        
-        # Check for positive indicators
-        positive_words = ["да", "согласен", "принимаю", "готов", "хорошо", "ладно", "окей", "конечно"]
-        negative_words = ["нет", "не могу", "отказываюсь", "занят", "не готов", "не интересует"]
-        question_words = ["что", "какой", "когда", "где", "сколько", "почему", "как"]
+        text = response.casefold()
         
-        is_positive = any(word in response_lower for word in positive_words)
-        is_negative = any(word in response_lower for word in negative_words)
-        is_question = any(word in response_lower for word in question_words) or "?" in response
+        is_positive = _POSITIVE_RE.search(text) is not None
+        is_negative = _NEGATIVE_RE.search(text) is not None
+        is_question = "?" in text or _QUESTION_RE.search(text) is not None
         
         if is_question:
             return {"intent": "question", "confidence": 0.8}
@@ -213,10 +528,18 @@ class GigaChatClient:
         else:
             return {"intent": "unclear", "confidence": 0.5}
     
+    async def aclose(self):
+        """Close the GigaChat client including its async connections."""
+        if self._client is not None:
+            await self._client.aclose()
+        self.close()
+    
     def close(self):
         """Close the GigaChat client connection."""
+        self._cache.clear()
+        self._batcher.close()
         if self._client is not None:
-            # GigaChat client doesn't require explicit closing
+            self._client.close()
             self._client = None
     
     def __enter__(self):
@@ -1,13 +1,43 @@
 """Qdrant vector database integration for knowledge base RAG."""
+import asyncio
+import hashlib
 import logging
+import threading
+import time
 import uuid
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from dataclasses import dataclass
 
+import numpy as np
+
+from ..utils.cache import QueryCache
 from ..utils.config import QdrantConfig
 
 logger = logging.getLogger(__name__)
 
+# Namespace for deriving point IDs from document IDs (must stay stable,
+# otherwise existing points can no longer be addressed)
+_POINT_ID_NAMESPACE = uuid.NAMESPACE_DNS
+
+# Redis L2 tier: socket timeouts in seconds and how long to skip the tier
+# after a failure, so an unreachable server doesn't stall every lookup
+_REDIS_TIMEOUT = 0.25
+_REDIS_RETRY_AFTER = 30.0
+
+
+def _point_id(doc_id: Any) -> int:
+    """Convert a document ID to a stable Qdrant point ID.
+    
+    Args:
+        doc_id: Document ID (integers are used as is)
+        
+    Returns:
+        Numeric point ID, identical across processes for the same document ID
+    """
+    if isinstance(doc_id, int):
+        return doc_id
+    return uuid.uuid5(_POINT_ID_NAMESPACE, str(doc_id)).int % (2**63)
+
 
 @dataclass
 class KnowledgeDocument:
@@ -19,90 +49,417 @@ class KnowledgeDocument:
     score: float = 0.0
 
 
+class _EmbeddingCache:
+    """Two-level cache for text embeddings.
+    
+    L1 is an in-process LRU cache with TTL expiry. The optional L2 tier is
+    Redis, shared between workers and surviving restarts; vectors are
+    stored there as raw float16 bytes, half the size of float32. Keys
+    include the embedding model, so switching models never returns
+    vectors from a different embedding space.
+    """
+    
+    def __init__(
+        self,
+        model: str,
+        max_size: int,
+        ttl_seconds: float,
+        redis_url: Optional[str] = None,
+        redis_ttl_seconds: int = 7 * 24 * 3600,
+    ):
+        """Initialize the embedding cache.
+        
+        Args:
+            model: Name of the embedding model
+            max_size: Maximum number of vectors in L1 (0 disables L1)
+            ttl_seconds: Time-to-live of an L1 entry in seconds
+            redis_url: Redis URL for the L2 tier (L2 is disabled if not set)
+            redis_ttl_seconds: Time-to-live of an L2 entry in seconds
+        """
+        self.model = model
+        self._l1 = QueryCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._redis_url = redis_url
+        self._redis_ttl_seconds = redis_ttl_seconds
+        self._redis = None
+        self._redis_failed = False
+        self._redis_retry_at = 0.0
+        self.l2_hits = 0
+        self.l2_misses = 0
+    
+    def _key(self, text: str) -> str:
+        """Build the cache key for a text."""
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"emb:{self.model}:f16:{digest}"
+    
+    def _get_redis(self):
+        """Get or create the Redis client for the L2 tier.
+        
+        Returns:
+            Redis client, or None if L2 is disabled or recently failed
+        """
+        if self._redis_failed or time.monotonic() < self._redis_retry_at:
+            return None
+        if self._redis is None and self._redis_url:
+            try:
+                import redis
+                
+                self._redis = redis.Redis.from_url(
+                    self._redis_url,
+                    socket_connect_timeout=_REDIS_TIMEOUT,
+                    socket_timeout=_REDIS_TIMEOUT,
+                )
+            except ImportError:
+                self._redis_failed = True
+                logger.warning(
+                    "redis package not installed. "
+                    "Install with: pip install redis"
+                )
+        return self._redis
+    
+    def _redis_error(self, action: str, error: Exception):
+        """Log an L2 failure and skip the tier for a while.
+        
+        Args:
+            action: Failed operation for the log message
+            error: Raised exception
+        """
+        self._redis_retry_at = time.monotonic() + _REDIS_RETRY_AFTER
+        logger.warning(
+            f"Embedding cache L2 {action} failed, skipping Redis for "
+            f"{_REDIS_RETRY_AFTER:.0f}s: {error}"
+        )
+    
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Get cached embeddings for texts.
+        
+        Args:
+            texts: Embedded texts
+            
+        Returns:
+            Embedding vector or None for each text
+        """
+        keys = [self._key(text) for text in texts]
+        vectors = [self._l1.get(key) for key in keys]
+        
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        redis_client = self._get_redis()
+        if missing and redis_client is not None:
+            try:
+                values = redis_client.mget([keys[i] for i in missing])
+            except Exception as e:
+                self._redis_error("lookup", e)
+                values = [None] * len(missing)
+            
+            for i, value in zip(missing, values):
+                if value is None:
+                    self.l2_misses += 1
+                    continue
+                self.l2_hits += 1
+                vectors[i] = np.frombuffer(value, dtype=np.float16).tolist()
+                self._l1.put(keys[i], vectors[i])
+        
+        return vectors
+    
+    def put_many(self, items: List[Tuple[str, List[float]]]):
+        """Store embeddings for texts.
+        
+        Args:
+            items: List of (text, embedding) pairs
+        """
+        keyed = [(self._key(text), vector) for text, vector in items]
+        for key, vector in keyed:
+            self._l1.put(key, vector)
+        
+        redis_client = self._get_redis()
+        if keyed and redis_client is not None:
+            try:
+                pipe = redis_client.pipeline(transaction=False)
+                for key, vector in keyed:
+                    pipe.setex(
+                        key,
+                        self._redis_ttl_seconds,
+                        np.asarray(vector, dtype=np.float16).tobytes(),
+                    )
+                pipe.execute()
+            except Exception as e:
+                self._redis_error("store", e)
+    
+    def clear(self):
+        """Remove all embeddings from L1 and close the L2 connection."""
+        self._l1.clear()
+        if self._redis is not None:
+            self._redis.close()
+            self._redis = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics.
+        
+        Returns:
+            Dictionary with L1 statistics, L2 hits/misses and overall hit rate
+        """
+        stats: Dict[str, Any] = self._l1.stats()
+        stats["l2_hits"] = self.l2_hits
+        stats["l2_misses"] = self.l2_misses
+        lookups = stats["hits"] + stats["misses"]
+        hits = stats["hits"] + self.l2_hits
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+
 class QdrantKnowledgeBase:
     """Knowledge base using Qdrant vector database for RAG."""
     
-    def __init__(self, config: QdrantConfig):
+    def __init__(self, config: QdrantConfig, embeddings_client=None):
         """Initialize Qdrant knowledge base client.
         
         Args:
             config: Qdrant configuration object
+            embeddings_client: GigaChat instance to use for embeddings
+                (a dedicated one is created on first use if not provided)
         """
         self.config = config
+        self._giga = embeddings_client
+        self._owns_giga = False
+        self._embedding_cache = _EmbeddingCache(
+            model=config.embedding_model,
+            max_size=config.embedding_cache_size,
+            ttl_seconds=config.embedding_cache_ttl_seconds,
+            redis_url=config.embedding_cache_redis_url,
+            redis_ttl_seconds=config.embedding_cache_redis_ttl_seconds,
+        )
+        # Shared fallback for empty texts and failed embeddings (never mutated)
+        self._zero_vector: List[float] = np.zeros(
+            config.vector_size, dtype=np.float32
+        ).tolist()
         self._client = None
         self._initialized = False
+        self._init_lock = threading.Lock()
         
     def _initialize(self):
         """Initialize the Qdrant client and ensure collection exists."""
         if self._initialized:
             return
+        
+        with self._init_lock:
+            if self._initialized:
+                return
             
-        try:
-            from qdrant_client import QdrantClient
-            from qdrant_client.models import Distance, VectorParams
-            
-            # Connect to Qdrant
-            self._client = QdrantClient(
-                url=self.config.url,
-                api_key=self.config.api_key,
-            )
-            
-            # Check if collection exists, create if not
-            collections = self._client.get_collections()
-            collection_names = [c.name for c in collections.collections]
-            
-            if self.config.collection_name not in collection_names:
-                self._client.create_collection(
-                    collection_name=self.config.collection_name,
-                    vectors_config=VectorParams(
-                        size=self.config.vector_size,
-                        distance=Distance.COSINE,
-                    ),
+            try:
+                from qdrant_client import QdrantClient
+                
+                # Connect to Qdrant
+                self._client = QdrantClient(
+                    url=self.config.url,
+                    api_key=self.config.api_key,
                 )
-                logger.info(
-                    f"Created collection: {self.config.collection_name}"
+                
+                # Check if collection exists, create if not
+                collections = self._client.get_collections()
+                collection_names = [c.name for c in collections.collections]
+                
+                if self.config.collection_name not in collection_names:
+                    self._create_collection()
+                    logger.info(
+                        f"Created collection: {self.config.collection_name}"
+                    )
+                
+                self._initialized = True
+                logger.info("Qdrant client initialized successfully")
+                
+            except ImportError:
+                logger.warning(
+                    "qdrant-client package not installed. "
+                    "Install with: pip install qdrant-client"
                 )
+            except Exception as e:
+                logger.error(f"Failed to initialize Qdrant client: {e}")
+    
+    def _create_collection(self):
+        """Create the collection with the configured vector quantization."""
+        from qdrant_client.models import (
+            BinaryQuantization,
+            BinaryQuantizationConfig,
+            Distance,
+            ScalarQuantization,
+            ScalarQuantizationConfig,
+            ScalarType,
+            VectorParams,
+        )
+        
+        quantization_config = None
+        if self.config.quantization == "int8":
+            quantization_config = ScalarQuantization(
+                scalar=ScalarQuantizationConfig(
+                    type=ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=True,
+                ),
+            )
+        elif self.config.quantization == "binary":
+            quantization_config = BinaryQuantization(
+                binary=BinaryQuantizationConfig(always_ram=True),
+            )
+        
+        self._client.create_collection(
+            collection_name=self.config.collection_name,
+            vectors_config=VectorParams(
+                size=self.config.vector_size,
+                distance=Distance.COSINE,
+            ),
+            quantization_config=quantization_config,
+        )
+    
+    def _search_params(self):
+        """Get search parameters that rescore quantized results.
+        
+        Returns:
+            SearchParams or None if quantization is disabled
+        """
+        if self.config.quantization not in ("int8", "binary"):
+            return None
+        
+        from qdrant_client.models import QuantizationSearchParams, SearchParams
+        
+        return SearchParams(
+            quantization=QuantizationSearchParams(rescore=True, oversampling=2.0),
+        )
+    
+    def _get_giga(self):
+        """Get or create the GigaChat client used for embeddings."""
+        if self._giga is None:
+            from gigachat import GigaChat
             
-            self._initialized = True
-            logger.info("Qdrant client initialized successfully")
+            # Note: You may need to configure this with your credentials
+            self._giga = GigaChat()
+            self._owns_giga = True
+        return self._giga
+    
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Get embeddings for a batch of texts in a single API call.
+        
+        Args:
+            texts: List of non-empty texts to embed
             
-        except ImportError:
-            logger.warning(
-                "qdrant-client package not installed. "
-                "Install with: pip install qdrant-client"
+        Returns:
+            List of embedding vectors in input order
+        """
+        result = self._get_giga().embeddings(texts, model=self.config.embedding_model)
+        if len(result.data) != len(texts):
+            raise ValueError(
+                f"Expected {len(texts)} embeddings, got {len(result.data)}"
             )
-        except Exception as e:
-            logger.error(f"Failed to initialize Qdrant client: {e}")
+        return [item.embedding for item in sorted(result.data, key=lambda d: d.index)]
     
     def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Get embeddings for texts using GigaChat.
         
+        Cached vectors are reused and repeated texts are embedded once; the
+        remaining texts are sent in batches of ``embedding_batch_size``. If
+        a batch fails, its texts are retried one by one so a single bad text
+        doesn't discard the whole batch.
+        
         Args:
             texts: List of texts to embed
             
         Returns:
             List of embedding vectors
         """
-        try:
-            from gigachat import GigaChat
+        embeddings: List[List[float]] = [self._zero_vector] * len(texts)
+        
+        # Empty texts keep the zero vector, duplicates are embedded once
+        positions: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            if text:
+                positions.setdefault(text, []).append(i)
+        
+        # Cached texts skip the API
+        unique = list(positions)
+        cached = self._embedding_cache.get_many(unique)
+        missing = []
+        for text, vector in zip(unique, cached):
+            if vector is not None:
+                for i in positions[text]:
+                    embeddings[i] = vector
+            else:
+                missing.append(text)
+        
+        batch_size = max(1, self.config.embedding_batch_size)
+        
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            try:
+                vectors = self._embed_batch(batch)
+            except Exception as e:
+                logger.warning(f"Batch embedding failed, retrying one by one: {e}")
+                vectors = []
+                for text in batch:
+                    try:
+                        vectors.append(self._embed_batch([text])[0])
+                    except Exception as e:
+                        logger.error(f"Failed to get embeddings: {e}")
+                        vectors.append(None)
             
-            # Use GigaChat for embeddings
-            # Note: You may need to configure this with your credentials
-            with GigaChat() as giga:
-                embeddings = []
-                for text in texts:
-                    result = giga.embeddings(input=[text])
-                    if result.data:
-                        embeddings.append(result.data[0].embedding)
-                    else:
-                        # Return zero vector if embedding fails
-                        embeddings.append([0.0] * self.config.vector_size)
-                return embeddings
-                
-        except Exception as e:
-            logger.error(f"Failed to get embeddings: {e}")
-            # Return zero vectors as fallback
-            return [[0.0] * self.config.vector_size for _ in texts]
+            # Failed texts keep the zero vector and are not cached
+            fetched = []
+            for text, vector in zip(batch, vectors):
+                if vector is not None:
+                    for i in positions[text]:
+                        embeddings[i] = vector
+                    fetched.append((text, vector))
+            self._embedding_cache.put_many(fetched)
+        
+        return embeddings
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get embedding cache statistics.
+        
+        Returns:
+            Dictionary with size, hits, misses, evictions and hit rate
+        """
+        return self._embedding_cache.stats()
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Get the embedding vector for a search query.
+        
+        Args:
+            query: Search query
+            
+        Returns:
+            Embedding vector
+        """
+        return self._get_embeddings([query])[0]
+    
+    def _iter_points(self, documents: List[Dict[str, Any]]):
+        """Embed documents batch by batch and yield them as points.
+        
+        Only one embedding batch is materialized at a time.
+        
+        Args:
+            documents: List of documents with 'content' and optional 'metadata'
+            
+        Yields:
+            PointStruct for each document
+        """
+        from qdrant_client.models import PointStruct
+        
+        batch_size = max(1, self.config.embedding_batch_size)
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            
+            # Extract contents and generate embeddings
+            contents = [doc.get("content", "") for doc in batch]
+            embeddings = self._get_embeddings(contents)
+            
+            for doc, content, embedding in zip(batch, contents, embeddings):
+                point_id = doc.get("id", str(uuid.uuid4()))
+                yield PointStruct(
+                    id=_point_id(point_id),
+                    vector=embedding,
+                    payload={
+                        "content": content,
+                        "metadata": doc.get("metadata", {}),
+                    },
+                )
     
     def add_documents(
         self,
@@ -123,38 +480,19 @@ class QdrantKnowledgeBase:
             return False
         
         try:
-            from qdrant_client.models import PointStruct
-            
-            # Extract contents and generate embeddings
-            contents = [doc.get("content", "") for doc in documents]
-            embeddings = self._get_embeddings(contents)
-            
-            # Create points
-            points = []
-            for i, doc in enumerate(documents):
-                point_id = doc.get("id", str(uuid.uuid4()))
-                payload = {
-                    "content": doc.get("content", ""),
-                    "metadata": doc.get("metadata", {}),
-                }
-                
-                # Use UUID for string IDs to avoid hash collisions
-                if isinstance(point_id, int):
-                    numeric_id = point_id
-                else:
-                    # Generate a unique numeric ID from UUID
-                    numeric_id = uuid.uuid5(uuid.NAMESPACE_DNS, str(point_id)).int % (2**63)
-                
-                points.append(PointStruct(
-                    id=numeric_id,
-                    vector=embeddings[i],
-                    payload=payload,
-                ))
-            
-            # Upload points
-            self._client.upsert(
+            # Upload points in batches as they are generated; parallel workers
+            # run in a process pool, which only pays off for multi-batch uploads
+            parallel = (
+                self.config.upsert_parallel
+                if len(documents) > self.config.upsert_batch_size
+                else 1
+            )
+            self._client.upload_points(
                 collection_name=self.config.collection_name,
-                points=points,
+                points=self._iter_points(documents),
+                batch_size=self.config.upsert_batch_size,
+                parallel=parallel,
+                wait=True,
             )
             
             logger.info(f"Added {len(documents)} documents to knowledge base")
@@ -169,6 +507,7 @@ class QdrantKnowledgeBase:
         query: str,
         limit: int = 5,
         score_threshold: float = 0.5,
+        query_embedding: Optional[List[float]] = None,
     ) -> List[KnowledgeDocument]:
         """Search the knowledge base for relevant documents.
         
@@ -176,6 +515,7 @@ class QdrantKnowledgeBase:
             query: Search query
             limit: Maximum number of results
             score_threshold: Minimum similarity score
+            query_embedding: Precomputed embedding of the query
             
         Returns:
             List of matching documents
@@ -188,7 +528,8 @@ class QdrantKnowledgeBase:
         
         try:
             # Get query embedding
-            query_embedding = self._get_embeddings([query])[0]
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
             
             # Search
             results = self._client.search(
@@ -196,6 +537,7 @@ class QdrantKnowledgeBase:
                 query_vector=query_embedding,
                 limit=limit,
                 score_threshold=score_threshold,
+                search_params=self._search_params(),
             )
             
             # Convert to KnowledgeDocument objects
@@ -216,40 +558,188 @@ class QdrantKnowledgeBase:
             logger.error(f"Search failed: {e}")
             return []
     
+    def batch_search(
+        self,
+        queries: List[str],
+        limit: int = 5,
+        score_threshold: float = 0.5,
+        sort_for_locality: bool = True,
+    ) -> List[List[KnowledgeDocument]]:
+        """Search the knowledge base for several queries in one request.
+        
+        All queries are embedded together and sent to Qdrant as a single
+        batch search instead of one round-trip per query.
+        
+        Args:
+            queries: Search queries
+            limit: Maximum number of results per query
+            score_threshold: Minimum similarity score
+            sort_for_locality: Submit queries grouped by their dominant
+                embedding dimension so similar queries are searched together
+            
+        Returns:
+            List of matching documents for each query, in input order
+        """
+        if not queries:
+            return []
+        
+        self._initialize()
+        
+        if self._client is None:
+            logger.error("Qdrant client not initialized")
+            return [[] for _ in queries]
+        
+        try:
+            from qdrant_client.models import SearchRequest
+            
+            query_vectors = self._get_embeddings(queries)
+            
+            order = list(range(len(queries)))
+            if sort_for_locality and len(queries) > 1:
+                dominant = np.argmax(np.abs(np.asarray(query_vectors)), axis=1)
+                order.sort(key=lambda i: int(dominant[i]))
+            
+            search_params = self._search_params()
+            batch_results = self._client.search_batch(
+                collection_name=self.config.collection_name,
+                requests=[
+                    SearchRequest(
+                        vector=query_vectors[i],
+                        limit=limit,
+                        score_threshold=score_threshold,
+                        params=search_params,
+                        with_payload=True,
+                        with_vectors=False,
+                    )
+                    for i in order
+                ],
+            )
+            
+            # Convert to KnowledgeDocument objects in input order
+            documents: List[List[KnowledgeDocument]] = [[] for _ in queries]
+            for i, results in zip(order, batch_results):
+                documents[i] = [
+                    KnowledgeDocument(
+                        id=str(result.id),
+                        content=result.payload.get("content", ""),
+                        metadata=result.payload.get("metadata", {}),
+                        score=result.score,
+                    )
+                    for result in results
+                ]
+            
+            logger.info(f"Batch search completed for {len(queries)} queries")
+            return documents
+            
+        except Exception as e:
+            logger.error(f"Batch search failed: {e}")
+            return [[] for _ in queries]
+    
+    async def asearch_many(
+        self,
+        queries: List[str],
+        limit: int = 5,
+        score_threshold: float = 0.5,
+    ) -> List[List[KnowledgeDocument]]:
+        """Search the knowledge base for several queries from async code.
+        
+        Runs batch_search on a worker thread, so all queries are embedded
+        in one batched call and searched in one request without blocking
+        the event loop.
+        
+        Args:
+            queries: Search queries
+            limit: Maximum number of results per query
+            score_threshold: Minimum similarity score
+            
+        Returns:
+            List of matching documents for each query, in input order
+        """
+        return await asyncio.to_thread(
+            self.batch_search, queries, limit, score_threshold
+        )
+    
+    def _search_raw(
+        self,
+        query: str,
+        limit: int = 5,
+        score_threshold: float = 0.5,
+        query_embedding: Optional[List[float]] = None,
+    ) -> Iterator[Tuple[str, str]]:
+        """Search the knowledge base and yield raw document contents.
+        
+        Only the "content" payload field is requested and stored vectors
+        are not returned. Hits are yielded one at a time without building
+        KnowledgeDocument objects, so callers can stop consuming early.
+        
+        Args:
+            query: Search query
+            limit: Maximum number of results
+            score_threshold: Minimum similarity score
+            query_embedding: Precomputed embedding of the query
+            
+        Yields:
+            (document ID, content) tuples, best match first
+        """
+        self._initialize()
+        
+        if self._client is None:
+            logger.error("Qdrant client not initialized")
+            return
+        
+        try:
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
+            
+            results = self._client.search(
+                collection_name=self.config.collection_name,
+                query_vector=query_embedding,
+                limit=limit,
+                score_threshold=score_threshold,
+                search_params=self._search_params(),
+                with_payload=["content"],
+                with_vectors=False,
+            )
+        except Exception as e:
+            logger.error(f"Search failed: {e}")
+            return
+        
+        for result in results:
+            yield str(result.id), result.payload.get("content", "")
+    
     def get_context_for_query(
         self,
         query: str,
         max_context_length: int = 2000,
+        query_embedding: Optional[List[float]] = None,
     ) -> str:
         """Get relevant context from knowledge base for a query.
         
         Args:
             query: The query to find context for
             max_context_length: Maximum length of combined context
+            query_embedding: Precomputed embedding of the query
             
         Returns:
             Concatenated relevant context string
         """
-        documents = self.search(query, limit=5)
-        
-        if not documents:
-            return ""
-        
-        # Combine document contents
         context_parts = []
-        current_length = 0
+        used = 0
         
-        for doc in documents:
-            content = doc.content
-            if current_length + len(content) > max_context_length:
-                # Truncate to fit
-                remaining = max_context_length - current_length
-                if remaining > 100:  # Only add if meaningful amount remains
-                    context_parts.append(content[:remaining] + "...")
-                break
+        # Hits are consumed lazily, so the loop stops at the budget
+        for _, content in self._search_raw(
+            query, limit=5, query_embedding=query_embedding
+        ):
+            if used + len(content) <= max_context_length:
+                context_parts.append(content)
+                used += len(content)
+                continue
             
-            context_parts.append(content)
-            current_length += len(content)
+            # Truncate the next document to fit
+            remaining = max_context_length - used
+            if remaining > 100:  # Only add if meaningful amount remains
+                context_parts.append(content[:remaining] + "...")
+            break
         
         return "\n\n".join(context_parts)
     
@@ -271,12 +761,8 @@ class QdrantKnowledgeBase:
         try:
             from qdrant_client.models import PointIdsList
             
-            # Convert string IDs to integer using UUID5 (same as in add_documents)
-            point_ids = [
-                uuid.uuid5(uuid.NAMESPACE_DNS, str(doc_id)).int % (2**63) 
-                if isinstance(doc_id, str) else doc_id
-                for doc_id in document_ids
-            ]
+            # Convert IDs the same way as in add_documents
+            point_ids = [_point_id(doc_id) for doc_id in document_ids]
             
             self._client.delete(
                 collection_name=self.config.collection_name,
@@ -303,20 +789,12 @@ class QdrantKnowledgeBase:
             return False
         
         try:
-            from qdrant_client.models import Distance, VectorParams
-            
             # Delete and recreate collection
             self._client.delete_collection(
                 collection_name=self.config.collection_name
             )
             
-            self._client.create_collection(
-                collection_name=self.config.collection_name,
-                vectors_config=VectorParams(
-                    size=self.config.vector_size,
-                    distance=Distance.COSINE,
-                ),
-            )
+            self._create_collection()
             
             logger.info(f"Cleared collection: {self.config.collection_name}")
             return True
@@ -325,8 +803,17 @@ class QdrantKnowledgeBase:
             logger.error(f"Failed to clear collection: {e}")
             return False
     
+    def warmup(self):
+        """Connect and ensure the collection exists ahead of the first request."""
+        self._initialize()
+    
     def close(self):
         """Close the Qdrant client connection."""
+        self._embedding_cache.clear()
+        if self._owns_giga and self._giga is not None:
+            self._giga.close()
+            self._giga = None
+            self._owns_giga = False
         if self._client is not None:
             self._client.close()
             self._client = None
@@ -1,13 +1,56 @@
 """Salute Speech integration for voice processing (STT/TTS)."""
 import asyncio
+import io
 import logging
-from typing import Optional, Union
+import threading
+import time
+import uuid
+import wave
+import weakref
+from typing import Dict, Optional, Union
 from pathlib import Path
 
 from ..utils.config import SaluteSpeechConfig
 
 logger = logging.getLogger(__name__)
 
+OAUTH_URL = "https://ngw.devices.sberbank.ru:9443/api/v2/oauth"
+TTS_URL = "https://smartspeech.sber.ru/rest/v1/text:synthesize"
+
+# Refresh the access token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 60.0
+
+# Background event loop shared by the synchronous wrappers
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_loop_lock = threading.Lock()
+
+
+def _run_sync(coro):
+    """Run a coroutine on the shared background event loop and wait for it.
+    
+    The loop is started on first use in a daemon thread and kept alive, so
+    client state bound to it (HTTP session, token, STT client) is reused
+    across synchronous calls.
+    
+    Args:
+        coro: Coroutine to run
+        
+    Returns:
+        Result of the coroutine
+    """
+    global _sync_loop
+    if _sync_loop is None:
+        with _sync_loop_lock:
+            if _sync_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever,
+                    name="salute-speech-sync",
+                    daemon=True,
+                ).start()
+                _sync_loop = loop
+    return asyncio.run_coroutine_threadsafe(coro, _sync_loop).result()
+
 
 class SaluteSpeechClient:
     """Client for Salute Speech voice processing (STT and TTS)."""
@@ -20,29 +63,155 @@ class SaluteSpeechClient:
         """
         self.config = config
         self._stt_client = None
+        # HTTP sessions are bound to the loop that created them, and the
+        # client may be used from the caller's loop and from the background
+        # loop of the synchronous wrappers, so both are kept per loop
+        self._tts_sessions: Dict[asyncio.AbstractEventLoop, object] = {}
+        self._tts_headers: Optional[dict] = None
+        self._token_expiry = 0.0
         self._initialized = False
+        self._init_locks = weakref.WeakKeyDictionary()
+        # Guards the per-loop state, which is touched from several threads
+        self._loops_lock = threading.Lock()
+    
+    def _get_init_lock(self) -> asyncio.Lock:
+        """Get the initialization lock for the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._loops_lock:
+            lock = self._init_locks.get(loop)
+            if lock is None:
+                lock = self._init_locks[loop] = asyncio.Lock()
+            return lock
         
     async def _initialize(self):
-        """Initialize the Salute Speech client asynchronously."""
+        """Initialize the Salute Speech client asynchronously.
+        
+        Initialization is idempotent, so callers on different event loops
+        only serialize with callers on the same loop.
+        """
         if self._initialized:
             return
+        
+        async with self._get_init_lock():
+            if self._initialized:
+                return
             
-        try:
-            # Import here to handle optional dependency
-            from salute_speech.speech_recognition import SaluteSpeechClient as SaluteSpeechSTT
+            await self._get_tts_headers()
+                
+            try:
+                # Import here to handle optional dependency
+                from salute_speech.speech_recognition import SaluteSpeechClient as SaluteSpeechSTT
+                
+                self._stt_client = SaluteSpeechSTT(
+                    client_credentials=self.config.client_credentials
+                )
+                self._initialized = True
+                logger.info("Salute Speech client initialized successfully")
+            except ImportError:
+                logger.warning(
+                    "salute_speech package not installed. "
+                    "Install with: pip install salute-speech"
+                )
+            except Exception as e:
+                logger.error(f"Failed to initialize Salute Speech client: {e}")
+    
+    def _get_tts_session(self):
+        """Get the HTTP session used for TTS requests on the running loop.
+        
+        The session is created lazily and keeps connections alive, so
+        concurrent and consecutive requests reuse pooled connections.
+        Sessions are kept per event loop: the synchronous wrappers run on
+        a background loop, async callers on their own. Sessions of loops
+        that have been closed are dropped, since they can't be used again.
+        
+        Returns:
+            aiohttp.ClientSession or None if aiohttp is not installed
+        """
+        loop = asyncio.get_running_loop()
+        session = self._tts_sessions.get(loop)
+        if session is None or session.closed:
+            try:
+                import aiohttp
+            except ImportError:
+                logger.warning(
+                    "aiohttp package not installed. "
+                    "Install with: pip install aiohttp"
+                )
+                return None
             
-            self._stt_client = SaluteSpeechSTT(
-                client_credentials=self.config.client_credentials
-            )
-            self._initialized = True
-            logger.info("Salute Speech client initialized successfully")
-        except ImportError:
-            logger.warning(
-                "salute_speech package not installed. "
-                "Install with: pip install salute-speech"
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.config.tts_concurrency or 32,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=60,
+                )
             )
+            with self._loops_lock:
+                for stale_loop in [l for l in self._tts_sessions if l.is_closed()]:
+                    del self._tts_sessions[stale_loop]
+                self._tts_sessions[loop] = session
+        return session
+    
+    async def _fetch_access_token(self) -> Optional[dict]:
+        """Exchange the authorization key for an OAuth access token.
+        
+        Returns:
+            Token response with 'access_token' and 'expires_at' or None if failed
+        """
+        session = self._get_tts_session()
+        if session is None:
+            return None
+        
+        headers = {
+            "Authorization": f"Basic {self.config.client_credentials}",
+            "RqUID": str(uuid.uuid4()),
+            "Content-Type": "application/x-www-form-urlencoded",
+        }
+        
+        try:
+            async with session.post(
+                OAUTH_URL, data={"scope": self.config.scope}, headers=headers
+            ) as response:
+                if response.status == 200:
+                    return await response.json()
+                error_text = await response.text()
+                logger.error(f"OAuth API error: {response.status} - {error_text}")
         except Exception as e:
-            logger.error(f"Failed to initialize Salute Speech client: {e}")
+            logger.error(f"Failed to obtain Salute Speech access token: {e}")
+        return None
+    
+    async def _get_tts_headers(self) -> dict:
+        """Get request headers for the TTS API.
+        
+        The access token is cached and refreshed shortly before it expires,
+        so the headers dict is shared between requests. If the token
+        exchange fails, the configured credentials are used as the bearer
+        token and the exchange is retried later.
+        
+        Returns:
+            Headers dict for TTS requests
+        """
+        if (
+            self._tts_headers is not None
+            and time.monotonic() < self._token_expiry - TOKEN_REFRESH_MARGIN
+        ):
+            return self._tts_headers
+        
+        token = await self._fetch_access_token()
+        if token and token.get("access_token"):
+            access_token = token["access_token"]
+            # expires_at is a Unix timestamp in milliseconds
+            ttl = token.get("expires_at", 0) / 1000 - time.time()
+            self._token_expiry = time.monotonic() + max(ttl, 0.0)
+        else:
+            access_token = self.config.client_credentials
+            self._token_expiry = time.monotonic() + 2 * TOKEN_REFRESH_MARGIN
+        
+        self._tts_headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+        }
+        return self._tts_headers
     
     async def speech_to_text(
         self,
@@ -70,20 +239,17 @@ class SaluteSpeechClient:
             # Handle different input types
             if isinstance(audio_data, (str, Path)):
                 audio_path = Path(audio_data)
-                if not audio_path.exists():
+                # Read the file off the event loop thread
+                try:
+                    audio_data = await asyncio.to_thread(audio_path.read_bytes)
+                except FileNotFoundError:
                     logger.error(f"Audio file not found: {audio_path}")
                     return None
-                with open(audio_path, "rb") as audio_file:
-                    result = await self._stt_client.audio.transcriptions.create(
-                        file=audio_file,
-                        language=language,
-                    )
-            else:
-                # Audio data as bytes
-                result = await self._stt_client.audio.transcriptions.create(
-                    file=audio_data,
-                    language=language,
-                )
+            
+            result = await self._stt_client.audio.transcriptions.create(
+                file=audio_data,
+                language=language,
+            )
             
             return result.text if result else None
             
@@ -96,6 +262,7 @@ class SaluteSpeechClient:
         text: str,
         voice: Optional[str] = None,
         output_path: Optional[Union[Path, str]] = None,
+        audio_format: str = "wav16",
     ) -> Optional[bytes]:
         """Convert text to speech audio.
         
@@ -103,6 +270,7 @@ class SaluteSpeechClient:
             text: Text to convert to speech
             voice: Voice identifier (default from config)
             output_path: Optional path to save audio file
+            audio_format: Output format ("wav16" or raw "pcm16")
             
         Returns:
             Audio data as bytes or None if failed
@@ -115,42 +283,54 @@ class SaluteSpeechClient:
             # Use HTTP API for TTS
             # Note: This is a simplified implementation
             # In production, use the full Salute Speech TTS API
-            import aiohttp
+            session = self._get_tts_session()
+            if session is None:
+                return None
             
-            # Sber SmartSpeech TTS endpoint
-            url = "https://smartspeech.sber.ru/rest/v1/text:synthesize"
-            
-            headers = {
-                "Authorization": f"Bearer {self.config.client_credentials}",
-                "Content-Type": "application/json",
-            }
+            headers = await self._get_tts_headers()
             
             payload = {
                 "text": text,
                 "voice": voice,
-                "format": "wav16",
+                "format": audio_format,
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        audio_data = await response.read()
-                        
-                        if output_path:
-                            output_path = Path(output_path)
-                            output_path.write_bytes(audio_data)
-                            logger.info(f"Audio saved to: {output_path}")
-                        
-                        return audio_data
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"TTS API error: {response.status} - {error_text}")
-                        return None
+            async with session.post(TTS_URL, json=payload, headers=headers) as response:
+                if response.status == 200:
+                    audio_data = await response.read()
+                    
+                    if output_path:
+                        output_path = Path(output_path)
+                        output_path.write_bytes(audio_data)
+                        logger.info(f"Audio saved to: {output_path}")
+                    
+                    return audio_data
+                else:
+                    error_text = await response.text()
+                    logger.error(f"TTS API error: {response.status} - {error_text}")
+                    return None
                         
         except Exception as e:
             logger.error(f"Text-to-speech conversion failed: {e}")
             return None
     
+    def pcm_to_wav(self, pcm_data: bytes) -> bytes:
+        """Wrap raw 16-bit mono PCM audio into a WAV container.
+        
+        Args:
+            pcm_data: Raw PCM audio as returned for the "pcm16" format
+            
+        Returns:
+            WAV audio data as bytes
+        """
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(self.config.sample_rate)
+            wav_file.writeframes(pcm_data)
+        return buffer.getvalue()
+    
     def speech_to_text_sync(
         self,
         audio_data: Union[bytes, Path, str],
@@ -165,7 +345,7 @@ class SaluteSpeechClient:
         Returns:
             Transcribed text or None if failed
         """
-        return asyncio.run(self.speech_to_text(audio_data, language))
+        return _run_sync(self.speech_to_text(audio_data, language))
     
     def text_to_speech_sync(
         self,
@@ -183,10 +363,28 @@ class SaluteSpeechClient:
         Returns:
             Audio data as bytes or None if failed
         """
-        return asyncio.run(self.text_to_speech(text, voice, output_path))
+        return _run_sync(self.text_to_speech(text, voice, output_path))
     
     async def close(self):
-        """Close the Salute Speech client connections."""
+        """Close the Salute Speech client connections.
+        
+        Sessions opened on other running loops (e.g. by the synchronous
+        wrappers) are closed on their own loop.
+        """
+        current_loop = asyncio.get_running_loop()
+        with self._loops_lock:
+            sessions, self._tts_sessions = self._tts_sessions, {}
+        for loop, session in sessions.items():
+            if session.closed:
+                continue
+            if loop is current_loop:
+                await session.close()
+            elif loop.is_running():
+                await asyncio.wrap_future(
+                    asyncio.run_coroutine_threadsafe(session.close(), loop)
+                )
+        self._tts_headers = None
+        self._token_expiry = 0.0
         self._stt_client = None
         self._initialized = False
     
@@ -1,10 +1,14 @@
 """Voximplant integration for ATS/telephony calls."""
 import logging
-from typing import Optional, List, Dict, Any
-from dataclasses import dataclass, field
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Tuple
+from dataclasses import dataclass
 from datetime import datetime
 
+from ..utils.cache import QueryCache
 from ..utils.config import VoximplantConfig
+from ..utils.serialization import dumps
 
 logger = logging.getLogger(__name__)
 
@@ -24,14 +28,14 @@ class CallInfo:
     result: Optional[str] = None  # "accepted", "declined", "no_answer", "error"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ExecutorInfo:
     """Information about an executor to be called."""
     
     executor_id: str
     name: str
     phone_number: str
-    skills: List[str] = field(default_factory=list)
+    skills: Tuple[str, ...] = ()
     rating: float = 0.0
     is_available: bool = True
 
@@ -48,74 +52,100 @@ class VoximplantClient:
         self.config = config
         self._api = None
         self._initialized = False
+        self._init_lock = threading.Lock()
+        # Live calls are kept until they end; ended calls move to a bounded
+        # LRU/TTL map so they stay available for status lookups for a while
+        # and then age out instead of leaking
         self._active_calls: Dict[str, CallInfo] = {}
+        self._calls_lock = threading.Lock()
+        self._ended_calls = QueryCache(
+            max_size=config.max_tracked_calls,
+            ttl_seconds=config.call_retention_seconds,
+        )
         
     def _initialize(self):
         """Initialize the Voximplant API client."""
         if self._initialized:
             return
+        
+        with self._init_lock:
+            if self._initialized:
+                return
             
-        try:
-            from voximplant.apiclient import VoximplantAPI, VoximplantAPIConfig
-            
-            api_config = VoximplantAPIConfig(
-                credentials_file_path=self.config.credentials_file_path
-            )
-            self._api = VoximplantAPI(config=api_config)
-            self._initialized = True
-            logger.info("Voximplant API client initialized successfully")
-        except ImportError:
-            logger.warning(
-                "voximplant-apiclient package not installed. "
-                "Install with: pip install voximplant-apiclient"
-            )
-        except FileNotFoundError:
-            logger.error(
-                f"Voximplant credentials file not found: "
-                f"{self.config.credentials_file_path}"
-            )
-        except Exception as e:
-            logger.error(f"Failed to initialize Voximplant API client: {e}")
+            try:
+                from voximplant.apiclient import VoximplantAPI, VoximplantAPIConfig
+                
+                api_config = VoximplantAPIConfig(
+                    credentials_file_path=self.config.credentials_file_path
+                )
+                self._api = VoximplantAPI(config=api_config)
+                self._initialized = True
+                logger.info("Voximplant API client initialized successfully")
+            except ImportError:
+                logger.warning(
+                    "voximplant-apiclient package not installed. "
+                    "Install with: pip install voximplant-apiclient"
+                )
+            except FileNotFoundError:
+                logger.error(
+                    f"Voximplant credentials file not found: "
+                    f"{self.config.credentials_file_path}"
+                )
+            except Exception as e:
+                logger.error(f"Failed to initialize Voximplant API client: {e}")
     
-    def start_call(
+    def _check_ready(self) -> bool:
+        """Initialize the API and check that scenarios can be started.
+        
+        Returns:
+            True if calls can be started
+        """
+        self._initialize()
+        
+        if self._api is None:
+            logger.error("Voximplant API not initialized")
+            return False
+        
+        if not self.config.rule_id:
+            logger.error("Voximplant rule_id not configured")
+            return False
+        
+        return True
+    
+    def _start_call(
         self,
         executor: ExecutorInfo,
-        order_info: dict,
+        order_blob: bytes,
         custom_data: Optional[dict] = None,
     ) -> Optional[CallInfo]:
-        """Start a call to an executor.
+        """Start a call to an executor with a pre-serialized order.
         
         Args:
             executor: Information about the executor to call
-            order_info: Information about the order
+            order_blob: Order information serialized to JSON
             custom_data: Additional custom data to pass to the scenario
             
         Returns:
             CallInfo object or None if failed
         """
-        self._initialize()
-        
-        if self._api is None:
-            logger.error("Voximplant API not initialized")
-            return None
-        
-        if not self.config.rule_id:
-            logger.error("Voximplant rule_id not configured")
-            return None
-        
         try:
             # Prepare custom data for the scenario
             scenario_data = {
                 "executor_id": executor.executor_id,
                 "executor_name": executor.name,
                 "phone_number": executor.phone_number,
-                "order": order_info,
             }
             if custom_data:
                 scenario_data.update(custom_data)
             
-            import json
-            custom_data_str = json.dumps(scenario_data)
+            if "order" in scenario_data:
+                # Custom data overrides the order
+                custom_data_str = dumps(scenario_data).decode("utf-8")
+            else:
+                # Splice the already serialized order into the object
+                custom_data_str = (
+                    dumps(scenario_data)[:-1] + b',"order":' + order_blob + b"}"
+                ).decode("utf-8")
             
             # Start the scenario
             response = self._api.start_scenarios(
@@ -137,7 +167,8 @@ class VoximplantClient:
                 started_at=datetime.now(),
             )
             
-            self._active_calls[call_id] = call_info
+            with self._calls_lock:
+                self._active_calls[call_id] = call_info
             logger.info(f"Call initiated: {call_id} to {executor.phone_number}")
             
             return call_info
@@ -146,8 +177,70 @@ class VoximplantClient:
             logger.error(f"Failed to start call: {e}")
             return None
     
+    def start_call(
+        self,
+        executor: ExecutorInfo,
+        order_info: dict,
+        custom_data: Optional[dict] = None,
+    ) -> Optional[CallInfo]:
+        """Start a call to an executor.
+        
+        Args:
+            executor: Information about the executor to call
+            order_info: Information about the order
+            custom_data: Additional custom data to pass to the scenario
+            
+        Returns:
+            CallInfo object or None if failed
+        """
+        if not self._check_ready():
+            return None
+        
+        try:
+            order_blob = dumps(order_info)
+        except Exception as e:
+            logger.error(f"Failed to start call: {e}")
+            return None
+        
+        return self._start_call(executor, order_blob, custom_data)
+    
+    def start_calls(
+        self,
+        executors: List[ExecutorInfo],
+        order_info: dict,
+        custom_data: Optional[dict] = None,
+    ) -> List[Optional[CallInfo]]:
+        """Start calls to several executors for the same order.
+        
+        The order is serialized once and scenarios are started in parallel,
+        up to config.dial_parallel at a time.
+        
+        Args:
+            executors: Executors to call
+            order_info: Information about the order
+            custom_data: Additional custom data to pass to each scenario
+            
+        Returns:
+            CallInfo object or None for each executor, in input order
+        """
+        if not executors or not self._check_ready():
+            return [None] * len(executors)
+        
+        try:
+            order_blob = dumps(order_info)
+        except Exception as e:
+            logger.error(f"Failed to start calls: {e}")
+            return [None] * len(executors)
+        
+        workers = max(1, min(self.config.dial_parallel, len(executors)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(
+                lambda executor: self._start_call(executor, order_blob, custom_data),
+                executors,
+            ))
+    
     def get_call_status(self, call_id: str) -> Optional[CallInfo]:
-        """Get the status of an active call.
+        """Get the status of an active or recently ended call.
         
         Args:
             call_id: ID of the call
@@ -155,7 +248,10 @@ class VoximplantClient:
         Returns:
             CallInfo object or None if not found
         """
-        return self._active_calls.get(call_id)
+        call_info = self._active_calls.get(call_id)
+        if call_info is None:
+            call_info = self._ended_calls.get(call_id)
+        return call_info
     
     def end_call(self, call_id: str, result: str) -> bool:
         """Mark a call as ended.
@@ -165,25 +261,29 @@ class VoximplantClient:
             result: Result of the call
             
         Returns:
-            True if successful
+            True if successful, False if the call is unknown or already ended
         """
-        if call_id in self._active_calls:
-            call_info = self._active_calls[call_id]
-            call_info.status = "ended"
-            call_info.ended_at = datetime.now()
-            call_info.result = result
-            
-            if call_info.started_at:
-                delta = call_info.ended_at - call_info.started_at
-                call_info.duration_seconds = int(delta.total_seconds())
-            
-            logger.info(
-                f"Call ended: {call_id}, result: {result}, "
-                f"duration: {call_info.duration_seconds}s"
-            )
-            return True
+        with self._calls_lock:
+            call_info = self._active_calls.pop(call_id, None)
+        if call_info is None:
+            return False
         
-        return False
+        call_info.status = "ended"
+        call_info.ended_at = datetime.now()
+        call_info.result = result
+        
+        if call_info.started_at:
+            delta = call_info.ended_at - call_info.started_at
+            call_info.duration_seconds = int(delta.total_seconds())
+        
+        # Keep the ended call for status lookups for the retention period
+        self._ended_calls.put(call_id, call_info)
+        
+        logger.info(
+            f"Call ended: {call_id}, result: {result}, "
+            f"duration: {call_info.duration_seconds}s"
+        )
+        return True
     
     def get_call_history(
         self,
@@ -263,6 +363,10 @@ class VoximplantClient:
             logger.error(f"Failed to send SMS: {e}")
             return False
     
+    def warmup(self):
+        """Load API credentials ahead of the first request."""
+        self._initialize()
+    
     def close(self):
         """Close the Voximplant client."""
         self._api = None
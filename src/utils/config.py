@@ -1,13 +1,23 @@
 """Configuration module for AI Agent."""
 import os
-from typing import Optional
-from pydantic import BaseModel, Field
-from dotenv import load_dotenv
+from typing import Any, Callable, ClassVar, Dict, Literal, Mapping, Optional, Tuple, Union
+from pydantic import BaseModel, ConfigDict, Field
+
+# Configuration is read-only after loading, so instances can be shared freely
+# and nested models are passed through without defensive copies
+_MODEL_CONFIG = ConfigDict(
+    frozen=True,
+    extra="forbid",
+    revalidate_instances="never",
+    validate_assignment=False,
+)
 
 
 class GigaChatConfig(BaseModel):
     """GigaChat API configuration."""
     
+    model_config = _MODEL_CONFIG
+    
     credentials: str = Field(..., description="GigaChat authorization key")
     scope: str = Field(
         default="GIGACHAT_API_PERS",
@@ -21,20 +31,54 @@ class GigaChatConfig(BaseModel):
         default="GigaChat",
         description="Model name to use"
     )
+    cache_max_size: int = Field(
+        default=1024,
+        description="Maximum number of cached responses (0 disables the cache)"
+    )
+    cache_ttl_seconds: float = Field(
+        default=300.0,
+        description="Time-to-live of a cached response in seconds"
+    )
+    batch_size: int = Field(
+        default=8,
+        description="Maximum number of chat requests sent together"
+    )
+    batch_max_wait_ms: float = Field(
+        default=50.0,
+        description="Maximum time to wait for a batch to fill in milliseconds"
+    )
+    stream_responses: bool = Field(
+        default=False,
+        description="Whether to stream responses and synthesize speech sentence by "
+                    "sentence; lowers time to first audio, but streamed requests "
+                    "bypass the request batcher"
+    )
 
 
 class SaluteSpeechConfig(BaseModel):
     """Salute Speech API configuration."""
     
+    model_config = _MODEL_CONFIG
+    
     client_credentials: str = Field(..., description="Sber Speech API key")
+    scope: str = Field(
+        default="SALUTE_SPEECH_PERS",
+        description="API scope (SALUTE_SPEECH_PERS for individuals, SALUTE_SPEECH_CORP for business)"
+    )
     language: str = Field(default="ru-RU", description="Language for speech recognition")
     voice: str = Field(default="Nec_24000", description="Voice for text-to-speech")
     sample_rate: int = Field(default=24000, description="Audio sample rate")
+    tts_concurrency: int = Field(
+        default=32,
+        description="Maximum number of concurrent connections to the TTS API"
+    )
 
 
 class VoximplantConfig(BaseModel):
     """Voximplant API configuration."""
     
+    model_config = _MODEL_CONFIG
+    
     credentials_file_path: str = Field(
         ..., 
         description="Path to Voximplant credentials JSON file"
@@ -51,11 +95,26 @@ class VoximplantConfig(BaseModel):
         default=None,
         description="Source phone number for sending SMS"
     )
+    max_tracked_calls: int = Field(
+        default=10000,
+        ge=1,
+        description="Maximum number of ended calls kept for status lookups"
+    )
+    call_retention_seconds: float = Field(
+        default=3600.0,
+        description="How long an ended call is kept for status lookups"
+    )
+    dial_parallel: int = Field(
+        default=4,
+        description="Number of scenarios started in parallel by bulk dialing"
+    )
 
 
 class QdrantConfig(BaseModel):
     """Qdrant vector database configuration."""
     
+    model_config = _MODEL_CONFIG
+    
     url: str = Field(
         default="http://localhost:6333",
         description="Qdrant server URL"
@@ -72,11 +131,201 @@ class QdrantConfig(BaseModel):
         default=1024,
         description="Size of embedding vectors"
     )
+    quantization: Literal["int8", "binary", "none"] = Field(
+        default="int8",
+        description="Vector quantization for new collections: 'int8', 'binary' or 'none'"
+    )
+    embedding_batch_size: int = Field(
+        default=32,
+        description="Number of texts embedded in a single GigaChat request"
+    )
+    upsert_batch_size: int = Field(
+        default=256,
+        description="Number of points per upload request"
+    )
+    upsert_parallel: int = Field(
+        default=1,
+        description="Number of parallel upload workers, used only for "
+                    "uploads larger than one batch"
+    )
+    embedding_model: str = Field(
+        default="Embeddings",
+        description="GigaChat model used to compute embeddings"
+    )
+    embedding_cache_size: int = Field(
+        default=2000,
+        description="Maximum number of cached embeddings (0 disables the cache)"
+    )
+    embedding_cache_ttl_seconds: float = Field(
+        default=600.0,
+        description="Time-to-live of a cached embedding in seconds"
+    )
+    embedding_cache_redis_url: Optional[str] = Field(
+        default=None,
+        description="Redis URL for the shared embedding cache tier (disabled if not set)"
+    )
+    embedding_cache_redis_ttl_seconds: int = Field(
+        default=7 * 24 * 3600,
+        description="Time-to-live of an embedding in the Redis cache tier in seconds"
+    )
+
+
+# Accepted spellings of a true boolean environment variable
+_TRUTHY = frozenset({
+    "1", "true", "True", "TRUE", "yes", "Yes", "YES", "on", "On", "ON",
+})
+
+
+def _bool(value: str) -> bool:
+    """Parse a boolean environment variable."""
+    return value.strip() in _TRUTHY
+
+
+def _optional_int(value: str) -> Optional[int]:
+    """Parse an optional integer environment variable."""
+    return int(value) if value else None
+
+
+def _optional_str(value: str) -> Optional[str]:
+    """Treat an unset or empty environment variable as missing."""
+    return value or None
+
+
+def _positive_int(value: str) -> int:
+    """Parse an integer environment variable that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise ValueError(f"Expected a positive integer, got {value!r}")
+    return number
+
+
+def _quantization(value: str) -> str:
+    """Parse a vector quantization mode, case-insensitively."""
+    mode = value.strip().lower()
+    if mode not in ("int8", "binary", "none"):
+        raise ValueError(
+            f"Invalid QDRANT_QUANTIZATION {value!r}: expected 'int8', 'binary' or 'none'"
+        )
+    return mode
+
+
+# (environment variable, field name, caster, default) for each model field;
+# the caster only runs for variables that are set
+EnvSpec = Tuple[Tuple[str, str, Callable[[str], Any], Any], ...]
+
+_GIGACHAT_ENV: EnvSpec = (
+    ("GIGACHAT_CREDENTIALS", "credentials", str, ""),
+    ("GIGACHAT_SCOPE", "scope", str, "GIGACHAT_API_PERS"),
+    ("GIGACHAT_VERIFY_SSL", "verify_ssl_certs", _bool, False),
+    ("GIGACHAT_MODEL", "model", str, "GigaChat"),
+    ("GIGACHAT_CACHE_MAX_SIZE", "cache_max_size", int, 1024),
+    ("GIGACHAT_CACHE_TTL", "cache_ttl_seconds", float, 300.0),
+    ("GIGACHAT_BATCH_SIZE", "batch_size", int, 8),
+    ("GIGACHAT_BATCH_MAX_WAIT_MS", "batch_max_wait_ms", float, 50.0),
+    ("GIGACHAT_STREAM", "stream_responses", _bool, False),
+)
+
+_SALUTE_SPEECH_ENV: EnvSpec = (
+    ("SALUTE_SPEECH_CREDENTIALS", "client_credentials", str, ""),
+    ("SALUTE_SPEECH_SCOPE", "scope", str, "SALUTE_SPEECH_PERS"),
+    ("SALUTE_SPEECH_LANGUAGE", "language", str, "ru-RU"),
+    ("SALUTE_SPEECH_VOICE", "voice", str, "Nec_24000"),
+    ("SALUTE_SPEECH_SAMPLE_RATE", "sample_rate", int, 24000),
+    ("SALUTE_SPEECH_TTS_CONCURRENCY", "tts_concurrency", int, 32),
+)
+
+_VOXIMPLANT_ENV: EnvSpec = (
+    ("VOXIMPLANT_CREDENTIALS_PATH", "credentials_file_path", str, ""),
+    ("VOXIMPLANT_APP_ID", "application_id", _optional_int, None),
+    ("VOXIMPLANT_RULE_ID", "rule_id", _optional_int, None),
+    ("VOXIMPLANT_SMS_SOURCE_NUMBER", "sms_source_number", _optional_str, None),
+    ("VOXIMPLANT_MAX_TRACKED_CALLS", "max_tracked_calls", _positive_int, 10000),
+    ("VOXIMPLANT_CALL_RETENTION", "call_retention_seconds", float, 3600.0),
+    ("VOXIMPLANT_DIAL_PARALLEL", "dial_parallel", int, 4),
+)
+
+_QDRANT_ENV: EnvSpec = (
+    ("QDRANT_URL", "url", str, "http://localhost:6333"),
+    ("QDRANT_API_KEY", "api_key", _optional_str, None),
+    ("QDRANT_COLLECTION", "collection_name", str, "knowledge_base"),
+    ("QDRANT_VECTOR_SIZE", "vector_size", int, 1024),
+    ("QDRANT_QUANTIZATION", "quantization", _quantization, "int8"),
+    ("QDRANT_EMBEDDING_BATCH_SIZE", "embedding_batch_size", int, 32),
+    ("QDRANT_UPSERT_BATCH_SIZE", "upsert_batch_size", int, 256),
+    ("QDRANT_UPSERT_PARALLEL", "upsert_parallel", int, 1),
+    ("QDRANT_EMBEDDING_MODEL", "embedding_model", str, "Embeddings"),
+    ("QDRANT_EMBEDDING_CACHE_SIZE", "embedding_cache_size", int, 2000),
+    ("QDRANT_EMBEDDING_CACHE_TTL", "embedding_cache_ttl_seconds", float, 600.0),
+    ("EMBEDDING_CACHE_REDIS_URL", "embedding_cache_redis_url", _optional_str, None),
+    ("EMBEDDING_CACHE_REDIS_TTL", "embedding_cache_redis_ttl_seconds", int, 604800),
+)
+
+_AGENT_ENV: EnvSpec = (
+    ("AGENT_NAME", "agent_name", str, "AI Агент"),
+    ("COMPANY_NAME", "company_name", str, "Компания"),
+    ("MAX_DIALOGUE_TURNS", "max_dialogue_turns", int, 10),
+    ("WARMUP_ON_START", "warmup_on_start", _bool, True),
+    ("MAX_HISTORY_MESSAGES", "max_history_messages", int, 16),
+    ("KNOWLEDGE_CACHE_SIZE", "knowledge_cache_size", int, 256),
+    ("KNOWLEDGE_CACHE_THRESHOLD", "knowledge_cache_threshold", float, 0.95),
+    ("ENABLE_TEMPLATE_SHORTCUT", "enable_template_shortcut", _bool, False),
+    ("TEMPLATE_SHORTCUT_THRESHOLD", "template_shortcut_threshold", float, 0.9),
+)
+
+
+def _read_env(spec: EnvSpec, get: Callable[[str], Optional[str]]) -> Dict[str, Any]:
+    """Read and convert the environment variables of one model.
+    
+    Args:
+        spec: Field specification table
+        get: Environment lookup function
+        
+    Returns:
+        Field values by field name
+    """
+    values = {}
+    for name, field, cast, default in spec:
+        value = get(name)
+        values[field] = default if value is None else cast(value)
+    return values
+
+
+# Variables copied from the .env file into os.environ; the file is parsed at
+# most once per process (see Config.reload_dotenv)
+_dotenv_applied: Optional[Dict[str, str]] = None
+
+
+def _apply_dotenv():
+    """Copy variables from the .env file into the process environment.
+    
+    Variables that are already set in the environment are left untouched,
+    so they take precedence over the file. The GigaChat SDK reads its own
+    GIGACHAT_* settings from the environment, so the values have to end up
+    in os.environ rather than only in the configuration.
+    """
+    global _dotenv_applied
+    if _dotenv_applied is not None:
+        return
+    
+    applied: Dict[str, str] = {}
+    # Skip dotenv entirely when variables come from the environment only
+    env_path = os.environ.get("DOTENV_PATH", ".env")
+    if os.path.isfile(env_path):
+        # Imported lazily so importing the config module doesn't load dotenv
+        from dotenv import dotenv_values
+        
+        for key, value in dotenv_values(env_path).items():
+            if value is not None and key not in os.environ:
+                os.environ[key] = value
+                applied[key] = value
+    _dotenv_applied = applied
 
 
 class Config(BaseModel):
     """Main configuration for AI Agent."""
     
+    model_config = _MODEL_CONFIG
+    
     gigachat: GigaChatConfig
     salute_speech: SaluteSpeechConfig
     voximplant: VoximplantConfig
@@ -95,38 +344,126 @@ class Config(BaseModel):
         default=10,
         description="Maximum number of dialogue turns before ending conversation"
     )
+    warmup_on_start: bool = Field(
+        default=True,
+        description="Whether to warm up integration connections in the background on start"
+    )
+    max_history_messages: int = Field(
+        default=16,
+        description="Maximum number of dialogue messages sent to GigaChat "
+                    "(at least 2: the first message and the latest one)"
+    )
+    knowledge_cache_size: int = Field(
+        default=256,
+        description="Maximum number of cached knowledge base contexts (0 disables the cache)"
+    )
+    knowledge_cache_threshold: float = Field(
+        default=0.95,
+        description="Minimum query similarity to reuse cached knowledge base context"
+    )
+    enable_template_shortcut: bool = Field(
+        default=False,
+        description="Answer questions directly from the knowledge base when a close match is found"
+    )
+    template_shortcut_threshold: float = Field(
+        default=0.9,
+        description="Minimum knowledge base similarity to answer a question without GigaChat"
+    )
+    
+    _instance: ClassVar[Optional["Config"]] = None
     
     @classmethod
     def from_env(cls) -> "Config":
-        """Create configuration from environment variables."""
-        load_dotenv()
+        """Create configuration from environment variables.
         
-        return cls(
-            gigachat=GigaChatConfig(
-                credentials=os.getenv("GIGACHAT_CREDENTIALS", ""),
-                scope=os.getenv("GIGACHAT_SCOPE", "GIGACHAT_API_PERS"),
-                verify_ssl_certs=os.getenv("GIGACHAT_VERIFY_SSL", "false").lower() == "true",
-                model=os.getenv("GIGACHAT_MODEL", "GigaChat"),
-            ),
-            salute_speech=SaluteSpeechConfig(
-                client_credentials=os.getenv("SALUTE_SPEECH_CREDENTIALS", ""),
-                language=os.getenv("SALUTE_SPEECH_LANGUAGE", "ru-RU"),
-                voice=os.getenv("SALUTE_SPEECH_VOICE", "Nec_24000"),
-                sample_rate=int(os.getenv("SALUTE_SPEECH_SAMPLE_RATE", "24000")),
-            ),
-            voximplant=VoximplantConfig(
-                credentials_file_path=os.getenv("VOXIMPLANT_CREDENTIALS_PATH", ""),
-                application_id=int(app_id) if (app_id := os.getenv("VOXIMPLANT_APP_ID")) else None,
-                rule_id=int(rule_id) if (rule_id := os.getenv("VOXIMPLANT_RULE_ID")) else None,
-                sms_source_number=os.getenv("VOXIMPLANT_SMS_SOURCE_NUMBER"),
-            ),
-            qdrant=QdrantConfig(
-                url=os.getenv("QDRANT_URL", "http://localhost:6333"),
-                api_key=os.getenv("QDRANT_API_KEY"),
-                collection_name=os.getenv("QDRANT_COLLECTION", "knowledge_base"),
-                vector_size=int(os.getenv("QDRANT_VECTOR_SIZE", "1024")),
+        The configuration is built once per process and shared by later
+        calls; use reset_cache() to rebuild it after the environment changes
+        and reload_dotenv() after the .env file changes.
+        """
+        if cls._instance is None:
+            cls._instance = cls._load_env()
+        return cls._instance
+    
+    @classmethod
+    def reset_cache(cls):
+        """Drop the cached configuration so the next from_env() rebuilds it."""
+        cls._instance = None
+    
+    def to_json(self) -> bytes:
+        """Serialize the configuration to JSON.
+        
+        Returns:
+            JSON document as bytes
+        """
+        return self.model_dump_json().encode("utf-8")
+    
+    @classmethod
+    def from_json(cls, data: Union[str, bytes]) -> "Config":
+        """Load configuration from JSON produced by to_json().
+        
+        Parsing and validation run in a single pass in pydantic-core.
+        
+        Args:
+            data: JSON document
+            
+        Returns:
+            Validated configuration
+        """
+        return cls.model_validate_json(data)
+    
+    @classmethod
+    def from_mapping(cls, mapping: Mapping[str, str]) -> "Config":
+        """Create configuration from a mapping of environment variables.
+        
+        Unlike from_env(), no .env file is read and the result is not
+        cached, so tests can build configurations without touching the
+        process environment.
+        
+        Values are converted to the field types here, so models are built
+        without validation. Set CONFIG_VALIDATE=1 to validate them.
+        
+        Args:
+            mapping: Variable names mapped to their values
+            
+        Returns:
+            Configuration built from the mapping
+        """
+        g = mapping.get
+        
+        config = cls.model_construct(
+            gigachat=GigaChatConfig.model_construct(**_read_env(_GIGACHAT_ENV, g)),
+            salute_speech=SaluteSpeechConfig.model_construct(
+                **_read_env(_SALUTE_SPEECH_ENV, g)
             ),
-            agent_name=os.getenv("AGENT_NAME", "AI Агент"),
-            company_name=os.getenv("COMPANY_NAME", "Компания"),
-            max_dialogue_turns=int(os.getenv("MAX_DIALOGUE_TURNS", "10")),
+            voximplant=VoximplantConfig.model_construct(**_read_env(_VOXIMPLANT_ENV, g)),
+            qdrant=QdrantConfig.model_construct(**_read_env(_QDRANT_ENV, g)),
+            **_read_env(_AGENT_ENV, g),
         )
+        
+        if _bool(g("CONFIG_VALIDATE", "")):
+            config = cls.model_validate(config.model_dump())
+        
+        return config
+    
+    @classmethod
+    def reload_dotenv(cls):
+        """Re-read the .env file and drop the cached configuration.
+        
+        Variables previously copied from the file are replaced unless they
+        were changed in the environment since.
+        """
+        global _dotenv_applied
+        for key, value in (_dotenv_applied or {}).items():
+            if os.environ.get(key) == value:
+                del os.environ[key]
+        _dotenv_applied = None
+        cls.reset_cache()
+    
+    @classmethod
+    def _load_env(cls) -> "Config":
+        """Build configuration from the .env file and environment variables.
+        
+        Process environment variables take precedence over the .env file.
+        """
+        _apply_dotenv()
+        return cls.from_mapping(os.environ)
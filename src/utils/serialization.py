@@ -0,0 +1,25 @@
+"""JSON serialization helpers."""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    # Optional dependency, stdlib json is used as a fallback
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize an object to UTF-8 encoded JSON.
+    
+    Uses orjson when it is installed and the standard library otherwise.
+    
+    Args:
+        obj: Object to serialize
+        
+    Returns:
+        JSON document as bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")